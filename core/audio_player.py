@@ -1,10 +1,13 @@
 import os
-import soundfile as sf
-import time
+import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread, QTimer
-import sounddevice as sd
-from core.playback_worker import PlaybackWorker
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer
+from utils.audio_utils import load_pcm_mono, downmix_to_mono, resample_audio
+
+# Reads the secondary A/B file alongside the primary one; file reads release the GIL
+_IO_POOL = ThreadPoolExecutor(max_workers=2)
 
 class AudioPlayer(QObject):
     """
@@ -27,23 +30,40 @@ class AudioPlayer(QObject):
         # Player state
         self.is_playing = False
         self.is_paused = False
-        self.current_position = 0.0     # Current position in seconds
+        self._current_sample = 0        # Current position in samples, see current_position
         self.duration = 0.0             # Duration of current audio in seconds
         self.current_file = None        # Path to currently loaded audio file
         self.sample_rate = 48000        # Default sample rate
-        self.playback_thread = None     # Thread for playback
+        self.playback_worker = None     # Owns the output stream during playback
         
         # Audio data
-        self.audio_data = None          # NumPy array of audio samples
-        self.audio_data_8k = None       # 8kHz version for comparison
+        self.audio_data = None          # NumPy array of audio samples (the active buffer)
+        self._buffers = {}              # All resident versions of the audio, keyed by sample rate
+        self._primary_rate = None       # Rate of the file as loaded
+        self._secondary_rate = 8000     # Rate of the version used for A/B comparison
         
-        # Position tracking timer
+        # Position tracking timer, runs during playback
         self.position_timer = QTimer()
-        self.position_timer.setInterval(50)  # Update position 20 times per second
+        self.position_timer.setInterval(16)  # Update position once per frame at 60 Hz
         self.position_timer.timeout.connect(self._update_position)
         
-        # For seeking
-        self.seek_position = None
+        # For seeking: pending target sample shared with the worker, -1 when none.
+        # A single aligned int64 store, so a burst of seeks collapses to the latest one.
+        self._seek_sample = ctypes.c_int64(-1)
+        # Non-zero once playback is stopped; shared with the worker
+        self._stop_flag = ctypes.c_int(0)
+        # Set while playing, cleared while paused; shared with the worker
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+        # position_changed is emitted at most once per 16 ms: updates only mark the
+        # position dirty and the next timer tick emits it
+        self._pos_dirty = False
+        self._last_emitted_sample = -1  # Position of the last emit, to skip repeats
+        self._flush_timer = QTimer()  # Flushes seeks while position_timer is not running
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(16)
+        self._flush_timer.timeout.connect(self._flush_position)
         
     def load_audio_file(self, file_path, secondary_file_path=None):
         """
@@ -62,34 +82,33 @@ class AudioPlayer(QObject):
                 self.error_occurred.emit(f"File not found: {file_path}")
                 return False
 
-            # Load the primary audio file using soundfile
-            # Request int16 directly as PlaybackWorker expects it
-            data, samplerate = sf.read(file_path, dtype='int16', always_2d=False)
+            # Start reading the secondary file so both reads overlap
+            secondary_future = None
+            if secondary_file_path and os.path.exists(secondary_file_path):
+                secondary_future = _IO_POOL.submit(self._read_audio, secondary_file_path)
 
-            # Ensure mono - soundfile reads mono as 1D, stereo as 2D
-            if data.ndim > 1:
-                # Simple approach: take the first channel if stereo
-                print(f"Warning: Loaded stereo file '{os.path.basename(file_path)}', using only first channel.")
-                data = data[:, 0]
+            data, samplerate = self._read_audio(file_path)
 
             self.sample_rate = samplerate
             self.channels = 1 # Assuming mono playback based on potential conversion above
             self.audio_data = data
+            self._buffers = {samplerate: data}
+            self._primary_rate = samplerate
             self.current_file = file_path
             self.duration = len(data) / self.sample_rate
             self.current_position = 0.0
+            self._last_emitted_sample = -1
 
-            # Load secondary file if provided
-            self.audio_data_8k = None # Reset
-            if secondary_file_path and os.path.exists(secondary_file_path):
+            # Load secondary file if provided, otherwise it is resampled on the first toggle
+            self._secondary_rate = 8000
+            if secondary_future is not None:
                 try:
-                    secondary_data, secondary_rate = sf.read(secondary_file_path, dtype='int16', always_2d=False)
-                    if secondary_data.ndim > 1:
-                         secondary_data = secondary_data[:, 0] # Use first channel if stereo
+                    secondary_data, secondary_rate = secondary_future.result()
 
                     # Basic check: ensure rate is somewhat low (e.g., < 12000)
                     if secondary_rate < 12000:
-                        self.audio_data_8k = secondary_data
+                        self._buffers[secondary_rate] = secondary_data
+                        self._secondary_rate = secondary_rate
                     else:
                         print(f"Warning: Secondary file '{os.path.basename(secondary_file_path)}' has sample rate {secondary_rate}, expected ~8kHz. Ignoring.")
 
@@ -105,7 +124,26 @@ class AudioPlayer(QObject):
             self.error_occurred.emit(f"Error loading audio file '{file_path}': {str(e)}")
             return False
 
-    
+    def _read_audio(self, file_path):
+        """
+        Read an audio file as mono int16 samples, the format PlaybackWorker expects.
+
+        Args:
+            file_path (str): Path to the audio file
+
+        Returns:
+            tuple: (audio_data, sample_rate)
+        """
+        # Files are read eagerly, never mapped, so the current take can be rewritten
+        # (re-record, trim) while it is loaded. PCM WAVs skip libsndfile.
+        data, samplerate = load_pcm_mono(file_path)
+        if data is None:
+            import soundfile as sf # Deferred so importing the player does not load libsndfile
+            # Always (frames, channels) so mono and multichannel take the same path
+            data, samplerate = sf.read(file_path, dtype='int16', always_2d=True)
+            data = downmix_to_mono(data)
+        return data, samplerate
+
     @pyqtSlot(str)
     def play(self, file_path=None):
         """Start or resume playback of an audio file."""
@@ -123,72 +161,87 @@ class AudioPlayer(QObject):
         if self.is_playing:
             return True
 
+        # Deferred so PortAudio is only initialised once something is played
+        from core.playback_worker import PlaybackWorker
+
         self.is_playing = True
         self.is_paused = False
-        self.seek_position = None
+        self._stop_flag.value = 0
+        self._seek_sample.value = -1
+        self._resume_event.set()
 
-        # Create a new QThread for playback
-        self.playback_thread = QThread()
-        
-        # Create PlaybackWorker with required parameters.
-        # We pass the audio data, sample rate, channels, current position and callbacks.
-        self.playback_worker = PlaybackWorker(
-            audio_data=self.audio_data,
-            sample_rate=self.sample_rate,
-            channels=self.channels,
-            start_position=self.current_position,
-            get_seek_position_callback=lambda: self._consume_seek(),
-            update_position_callback=self._update_current_position,
-            stop_flag_getter=lambda: not self.is_playing,
-            is_paused_getter=lambda: self.is_paused 
-        )
+        # Reuse the previous worker and its open output stream when the format matches;
+        # reopening the device costs tens of milliseconds on some host APIs.
+        worker = self.playback_worker
+        if worker is not None and (worker.sample_rate != self.sample_rate or worker.channels != self.channels):
+            worker.close()
+            worker = self.playback_worker = None
 
-        
-        # Move worker to the playback thread
-        self.playback_worker.moveToThread(self.playback_thread)
-        
-        # Connect signals: When thread starts, run the worker's run method
-        self.playback_thread.started.connect(self.playback_worker.run)
-        
-        # Connect finished signal to clean up
-        self.playback_worker.finished.connect(self._playback_finished)
-        self.playback_worker.error_occurred.connect(self.error_occurred)
-        
-        # Start the thread
-        self.playback_thread.start()
-        
-        # Start the QTimer (which is still in the main thread) to update UI position
+        if worker is not None:
+            worker.restart(self.audio_data, self._current_sample)
+        else:
+            # Create PlaybackWorker with required parameters.
+            # We pass the audio data, sample rate, channels, current position and shared flags.
+            # The worker owns a callback-driven output stream, so no playback thread is needed.
+            self.playback_worker = PlaybackWorker(
+                audio_data=self.audio_data,
+                sample_rate=self.sample_rate,
+                channels=self.channels,
+                start_sample=self._current_sample,
+                seek_sample=self._seek_sample,
+                stop_flag=self._stop_flag,
+                resume_event=self._resume_event
+            )
+
+            # Connect finished signal to clean up
+            self.playback_worker.finished.connect(self._playback_finished)
+            self.playback_worker.error_occurred.connect(self.error_occurred)
+
+            # Open and start the output stream
+            self.playback_worker.run()
+
+        if not self.is_playing: # Stream failed to start; _playback_finished already cleaned up
+            return False
+
+        # Start the QTimer to push position updates to the UI
         self.position_timer.start()
         
         # Emit signal that playback started
         self.playback_started.emit(os.path.basename(self.current_file), self.duration)
         return True
 
-    def _consume_seek(self):
-        """Helper to get and clear the seek position if one is requested."""
-        pos = self.seek_position
-        self.seek_position = None
-        return pos
+    def _sync_position(self):
+        """Refresh current_position from the sample the output device is playing."""
+        # A pending seek has not reached the worker yet, keep the requested position
+        if (self.is_playing and not self.is_paused and self.playback_worker is not None
+                and self._seek_sample.value < 0):
+            self._current_sample = self.playback_worker.playback_sample()
+        return self.current_position
+
+    @property
+    def current_position(self):
+        """Current position in seconds, derived from the integer sample position."""
+        return self._current_sample / self.sample_rate
 
-    def _update_current_position(self, pos):
-        """Update the current position based on worker callback."""
-        self.current_position = pos
-        self.position_changed.emit(pos, self.duration)
+    @current_position.setter
+    def current_position(self, seconds):
+        self._current_sample = int(round(seconds * self.sample_rate))
 
     def _playback_finished(self):
         """Cleanup after playback finishes."""
+        # A finish queued by a previous stream can arrive after stop() or after a new one started
+        if not self.is_playing or (self.playback_worker is not None and self.playback_worker.is_active()):
+            return
+
         self.is_playing = False
+        self._stop_flag.value = 1
         self.current_position = 0.0
         self.position_timer.stop()
         self.playback_stopped.emit()
         
-        # Safely quit and delete the playback thread
-        if self.playback_thread:
-            self.playback_thread.quit()
-            if not self.playback_thread.wait(1000):
-                print("Warning: Playback thread did not terminate in time.")
-            self.playback_thread = None
-            self.playback_worker = None
+        # Stop the finished output stream, keeping it open for the next play()
+        if self.playback_worker:
+            self.playback_worker.stop()
         
     def is_currently_playing(self):
         """Check if audio is currently playing."""
@@ -202,16 +255,15 @@ class AudioPlayer(QObject):
 
         self.is_playing = False
         self.is_paused = False
+        self._stop_flag.value = 1
         self.position_timer.stop()
 
-        # Wait for the worker thread to finish cleanup
-        if self.playback_thread and self.playback_thread.isRunning():
-            self.playback_thread.quit()
-            if not self.playback_thread.wait(1000):
-                print("Warning: Playback thread did not terminate in time.")
+        # Stop the output stream; it stays open so the next play() can restart it
+        if self.playback_worker:
+            self.playback_worker.stop()
 
         self.current_position = 0.0
-        self.position_changed.emit(self.current_position, self.duration)
+        self._emit_position()
         self.playback_stopped.emit()
     
     @pyqtSlot()
@@ -221,6 +273,9 @@ class AudioPlayer(QObject):
             return
             
         self.is_paused = True
+        # Halt the output stream; no callbacks run until resume()
+        if self.playback_worker:
+            self.playback_worker.pause()
         
         # Emit signal
         self.playback_paused.emit()
@@ -232,6 +287,8 @@ class AudioPlayer(QObject):
             return
             
         self.is_paused = False
+        if self.playback_worker:
+            self.playback_worker.resume()
         
         # Emit signal
         self.playback_resumed.emit()
@@ -252,20 +309,19 @@ class AudioPlayer(QObject):
         # Always update current position, regardless of playback state
         self.current_position = position_seconds
         
-        if self.is_playing and not self.is_paused:
-            # If playing, set the seek position so that the PlaybackWorker
-            # will pick it up in the next loop iteration.
-            self.seek_position = position_seconds
+        if self.is_playing:
+            # Hand the target sample to the PlaybackWorker; it jumps there in the
+            # next stream callback (or on resume, if paused).
+            self._seek_sample.value = self._current_sample
             
-            # Force an immediate position update to UI
-            self.position_changed.emit(position_seconds, self.duration)
-        else:
-            # If not playing, just update position
-            self.position_changed.emit(position_seconds, self.duration)
+        # Let the next timer tick update the UI, however many seeks arrive before it
+        self._pos_dirty = True
+        if not self.position_timer.isActive() and not self._flush_timer.isActive():
+            self._flush_timer.start()
     
     def get_position(self):
         """Get current playback position in seconds."""
-        return self.current_position
+        return self._sync_position()
     
     def get_duration(self):
         """Get audio duration in seconds."""
@@ -274,7 +330,21 @@ class AudioPlayer(QObject):
     def _update_position(self):
         """Update position timer callback."""
         if self.is_playing and not self.is_paused:
-            self.position_changed.emit(self.current_position, self.duration)
+            self._sync_position()
+            self._pos_dirty = True
+        self._flush_position()
+
+    def _flush_position(self):
+        """Emit position_changed if the position changed since the last emit."""
+        if self._pos_dirty:
+            self._pos_dirty = False
+            if self._current_sample != self._last_emitted_sample:
+                self._emit_position()
+
+    def _emit_position(self):
+        """Emit position_changed and remember which sample it reported."""
+        self._last_emitted_sample = self._current_sample
+        self.position_changed.emit(self.current_position, self.duration)
     
     def get_audio_data(self):
         """
@@ -286,53 +356,51 @@ class AudioPlayer(QObject):
         if self.audio_data is None:
             return None, None
         return self.audio_data, self.sample_rate
-    
-    def toggle_sample_rate(self):
-        """Toggle between primary and secondary (assumed 8kHz) for A/B comparison."""
-        # Check if secondary data exists and we are currently playing
-        if self.audio_data_8k is not None and self.is_playing:
-            current_pos = self.current_position # Store current position
 
-            # Stop current playback
-            self.stop() # This resets position, so we stored it above
+    def _get_buffer(self, rate):
+        """
+        Get the loaded audio at the given sample rate. A missing comparison
+        version is resampled from the primary audio on first use and kept, so
+        browsing items never pays for a resample that is not listened to.
+
+        Args:
+            rate (int): self._primary_rate or self._secondary_rate
+
+        Returns:
+            np.ndarray: Audio at the requested rate
+        """
+        if rate not in self._buffers:
+            self._buffers[rate] = resample_audio(self._buffers[self._primary_rate], self._primary_rate, rate)
+        return self._buffers[rate]
 
-            # Determine the rate of the current primary audio_data
-            # We assume the initial load sets self.sample_rate correctly
-            # We need a way to know the rate of the *other* file (audio_data_8k)
-            # For simplicity, let's assume primary is 48k and secondary is 8k
-            assumed_primary_rate = 48000
-            assumed_secondary_rate = 8000
+    def toggle_sample_rate(self):
+        """Toggle between primary and secondary (8kHz) audio for A/B comparison."""
+        # Check if audio is loaded and we are currently playing
+        if self._buffers and self.is_playing and self.playback_worker is not None:
+            current_pos = self._sync_position() # Store current position
 
             # Toggle between high and low sample rate data
-            if self.sample_rate == assumed_primary_rate:
-                # Switch to 8kHz data
-                temp_data = self.audio_data
-                self.audio_data = self.audio_data_8k
-                self.audio_data_8k = temp_data # Keep the 48k data in the secondary slot
-                self.sample_rate = assumed_secondary_rate
-                print("Switched playback to 8kHz")
-            elif self.sample_rate == assumed_secondary_rate:
-                 # Switch back to 48kHz data
-                 temp_data = self.audio_data
-                 self.audio_data = self.audio_data_8k
-                 self.audio_data_8k = temp_data # Keep the 8k data in the secondary slot
-                 self.sample_rate = assumed_primary_rate
-                 print("Switched playback to 48kHz")
-            else:
-                print(f"Warning: Cannot toggle sample rate from current rate {self.sample_rate}")
-                return # Don't restart playback if rates are unexpected
+            rate = self._secondary_rate if self.sample_rate == self._primary_rate else self._primary_rate
+            self.audio_data = self._get_buffer(rate)
+            self.sample_rate = rate
+            print(f"Switched playback to {self.sample_rate / 1000:g}kHz")
 
             # Update duration based on the new audio data
             self.duration = len(self.audio_data) / self.sample_rate
             self.duration_changed.emit(self.duration)
 
-            # Seek to the stored position in the new audio
-            self.seek(current_pos) # Update position before starting play
-
-            # Restart playback with the new data/rate
-            self.play()
+            # Hand the new buffer to the running worker at the same position;
+            # only the output stream is reopened, there is no stop/play round-trip
+            self.current_position = min(current_pos, self.duration)
+            self._seek_sample.value = -1
+            self.playback_worker.set_buffer(self.audio_data, self.sample_rate, self._current_sample)
+            self._last_emitted_sample = -1 # Sample indices now refer to the other rate
+            self._pos_dirty = True
 
     def cleanup(self):
         """Clean up resources before destruction."""
         self.stop()
-        self.position_timer.stop()
\ No newline at end of file
+        self.position_timer.stop()
+        if self.playback_worker:
+            self.playback_worker.close()
+            self.playback_worker = None
\ No newline at end of file
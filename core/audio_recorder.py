@@ -1,13 +1,29 @@
 # core/audio_recorder.py
 import os
 import time
+import contextlib
+import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import sounddevice as sd
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QThread, QTimer
 from PyQt5.QtWidgets import QApplication
 import soundfile as sf
-import pyaudio
-from utils.audio_utils import trim_silence_numpy # ADD
+from utils.audio_utils import trim_silence_numpy, resample_audio
+
+# libsndfile maps 0-1 onto FLAC levels 0-8; level 5 is the reference encoder's default,
+# higher levels shrink speech by well under 1% while encoding several times slower
+FLAC_COMPRESSION_LEVEL = 5 / 8
+
+# Finishes the 48kHz and 8kHz files of a take side by side
+_SAVE_POOL = ThreadPoolExecutor(max_workers=2)
+
+DEVICE_CACHE_TTL = 5.0 # Seconds a device listing is reused before PortAudio is queried again
+DEVICE_TEST_SILENCE_PEAK = int(1e-4 * 32767) # int16 peak at or below which a device test counts as silent
+# Smallest input blocksize used; below this the Python callback runs thousands of times
+# per second and competes with the GUI thread for the GIL, inviting input overflows
+MIN_INPUT_BLOCKSIZE = 256
 
 class RecorderThread(QThread):
     def __init__(self, recorder):
@@ -17,6 +33,56 @@ class RecorderThread(QThread):
     def run(self):
         self.recorder._record_audio()
 
+class RecordingBuffer:
+    """
+    Single-producer/single-consumer ring of (frames, channels) audio. The input
+    callback writes blocks into it and the recording thread drains them to disk,
+    so memory use stays constant however long the take is.
+    """
+
+    def __init__(self, samplerate, channels, dtype, seconds=10, blocksize=1):
+        # A whole number of blocks, so fixed-size blocks never wrap around mid-block
+        frames = -(-int(samplerate * seconds) // blocksize) * blocksize
+        self._data = np.empty((frames, channels), dtype=dtype)
+        self._write_pos = 0 # Total frames written; only the callback advances it
+        self._read_pos = 0  # Total frames drained; only the recording thread advances it
+        self.overflowed = False
+
+    @property
+    def dtype(self):
+        """Name of the sample dtype, e.g. 'int16'."""
+        return self._data.dtype.name
+
+    @property
+    def frames(self):
+        """Number of frames recorded so far."""
+        return self._write_pos
+
+    def write(self, block):
+        """Append one (frames, channels) block."""
+        n = len(block)
+        size = len(self._data)
+        if self._write_pos + n - self._read_pos > size:
+            # The writer fell a whole ring behind; drop the block rather than overwrite unsaved audio
+            self.overflowed = True
+            return
+        start = self._write_pos % size
+        first = min(n, size - start)
+        np.copyto(self._data[start:start + first], block[:first])
+        if first < n: # Wrap around to the front of the ring
+            np.copyto(self._data[:n - first], block[first:])
+        self._write_pos += n
+
+    def drain(self, sink):
+        """Pass all unread frames, oldest first, to sink (e.g. SoundFile.write)."""
+        end = self._write_pos
+        size = len(self._data)
+        while self._read_pos < end:
+            start = self._read_pos % size
+            count = min(end - self._read_pos, size - start)
+            sink(self._data[start:start + count])
+            self._read_pos += count
+
 class AudioRecorder(QObject):
     """Handles audio recording with support for multiple sample rates and ASIO."""
     
@@ -31,18 +97,33 @@ class AudioRecorder(QObject):
         self.padding_ms = 100 # Default, or load from settings
         self.auto_trim_on_save = False
         self.is_recording = False
-        self.recording_thread = None
-        self.frames_48k = []
-        self.frames_8k = []
+        self._stop_event = threading.Event() # Set to end the recording thread's wait
+        self.recording_thread = RecorderThread(self) # Restarted for every take
+        self.buffer_48k = None # RecordingBuffer per stream, created in start_recording
+        self.buffer_8k = None
+        self._derive_8k = False # True when the 8kHz file is resampled from the 48kHz take
         self.device_48k = None
         self.device_8k = None
         self.format = 'int16'
         self.channels = 1
         self.rate_48k = 48000
         self.rate_8k = 8000
-        self.chunk_size = 16
+        self.chunk_size = 1024 # Frames per input callback block, see apply_settings
         self.last_recording_duration = 0.0
         self.enable_8k = False
+        self.subtype = 'PCM_16' # soundfile subtype, see apply_settings
+        self.file_format = 'wav'
+        self._device_cache = {} # include_asio -> (time.monotonic() of the query, device list)
+
+        # The input callback only records the loudest level since the last meter update;
+        # this timer emits it from the GUI thread ~30 times per second
+        self._peak_level = ctypes.c_float(0.0)
+        self._level_timer = QTimer(self)
+        self._level_timer.setInterval(33)
+        self._level_timer.timeout.connect(self._emit_level)
+        # Also stop the meter when the take ends on its own, e.g. a device error,
+        # since stop_recording returns early once is_recording is False
+        self.recording_thread.finished.connect(self._level_timer.stop)
 
     def apply_settings(self, settings):
         """Apply settings from the settings dialog."""
@@ -55,7 +136,8 @@ class AudioRecorder(QObject):
                 self.format = 'int16'
                 self.subtype = 'PCM_16' # soundfile subtype
             elif bit_depth == "24-bit":
-                self.format = 'int24' # sounddevice format
+                # NumPy has no 24-bit dtype; record int32 and let soundfile pack it to 24 bits
+                self.format = 'int32' # sounddevice format
                 self.subtype = 'PCM_24' # soundfile subtype
             elif bit_depth == "32-bit float":
                 self.format = 'float32'
@@ -66,7 +148,7 @@ class AudioRecorder(QObject):
 
             # Apply buffer size
             buffer_size = settings.value("audio/buffer_size", "1024")
-            self.chunk_size = int(buffer_size) # Note: sounddevice callback doesn't use chunk_size directly
+            self.chunk_size = max(int(buffer_size), MIN_INPUT_BLOCKSIZE) # Used as the input streams' fixed blocksize
 
             # Trim threshold (needs conversion dB -> linear if needed by trimmer)
             # Assuming settings store dB or similar. Let's store dB.
@@ -86,8 +168,21 @@ class AudioRecorder(QObject):
             self.error_occurred.emit(f"Failed to apply settings: {str(e)}")
 
 
+    def invalidate_device_cache(self):
+        """Forget cached device listings, e.g. after a device was plugged in or removed."""
+        self._device_cache.clear()
+
     def get_available_devices(self, include_asio=True):
-        """Returns a list of available audio devices with fallbacks."""
+        """
+        Returns a list of available audio devices with fallbacks.
+
+        Listings are cached for DEVICE_CACHE_TTL seconds, since querying the
+        host audio APIs can take a noticeable fraction of a second.
+        """
+        cached = self._device_cache.get(include_asio)
+        if cached is not None and time.monotonic() - cached[0] < DEVICE_CACHE_TTL:
+            return list(cached[1])
+
         devices = []
         
         try:
@@ -106,6 +201,7 @@ class AudioRecorder(QObject):
             
             # If no devices found, try PyAudio as fallback
             if not devices:
+                import pyaudio # Only loaded when sounddevice finds nothing
                 p = pyaudio.PyAudio()
                 for i in range(p.get_device_count()):
                     device_info = p.get_device_info_by_index(i)
@@ -119,28 +215,28 @@ class AudioRecorder(QObject):
                         })
                 p.terminate()
                 
+            self._device_cache[include_asio] = (time.monotonic(), devices)
+                
         except Exception as e:
             self.error_occurred.emit(f"Failed to get audio devices: {str(e)}")
         
-        return devices
+        return list(devices)
     
     def test_recording_device(self, device_index):
         """Test if a device can actually record audio."""
         try:
-            # Create a short test recording
-            import numpy as np
-            
-            duration = 0.5  # seconds
+            # A short probe is enough to see whether the device delivers any signal
+            duration = 0.05  # seconds
             fs = 48000
             
-            # Record audio from the selected device
+            # Record audio from the selected device as int16, so the check needs no float copy
             recording = sd.rec(int(duration * fs), samplerate=fs, 
-                            channels=1, device=device_index, dtype='float32')
+                            channels=1, device=device_index, dtype='int16')
             sd.wait()
             
-            # Check if recording contains only silence
-            amplitude = np.abs(recording).max()
-            if amplitude < 0.01:
+            # Check if recording contains only silence (peak below -80 dBFS)
+            amplitude = max(int(recording.max()), -int(recording.min()))
+            if amplitude <= DEVICE_TEST_SILENCE_PEAK:
                 return False, "Device detected but not capturing audio"
             
             return True, "Device working correctly"
@@ -150,28 +246,50 @@ class AudioRecorder(QObject):
     
     @pyqtSlot(int, int, str, str)
     def start_recording(self, device_48k_idx, device_8k_idx, filename_48k=None, filename_8k=None):
+        """
+        Start a take on the recording thread.
+
+        Returns:
+            bool: True if the take was started, False if it was refused
+        """
         if self.is_recording:
-            return
+            return False
+        if self.recording_thread.isRunning():
+            # The previous take is still being written; its buffers and file names are in use
+            self.error_occurred.emit("The previous recording is still being saved. Please try again in a moment.")
+            return False
         
+        # Determine dtype based on self.format
+        dtype = self.format if self.format in ['int16', 'int32', 'float32'] else 'int16'
+
         self.device_48k = device_48k_idx
-        self.frames_48k = []
+        self.buffer_48k = RecordingBuffer(self.rate_48k, self.channels, dtype, blocksize=self.chunk_size)
         self.filename_48k = filename_48k
+        # Maps a raw sample peak to the 0-100 meter range
+        self._level_scale = 100.0 / (np.iinfo(dtype).max + 1) if np.dtype(dtype).kind == 'i' else 100.0
 
         # Check if the UI toggle for 8k recording is enabled.
         if self.enable_8k:
             self.device_8k = device_8k_idx
-            self.frames_8k = []
             self.filename_8k = filename_8k
+            # With one device for both rates, the 8kHz file is resampled from the 48kHz
+            # take on save instead of opening the device a second time
+            self._derive_8k = device_8k_idx == device_48k_idx
+            self.buffer_8k = None if self._derive_8k else RecordingBuffer(self.rate_8k, self.channels, dtype, blocksize=self.chunk_size)
         else:
             self.device_8k = None  # Skip 8k stream if toggle is off
+            self.buffer_8k = None
             self.filename_8k = None
+            self._derive_8k = False
 
-        # Start recording in a new thread using RecorderThread
+        # Run the take on the recorder's RecorderThread; a finished QThread can be started again
         self.is_recording = True
-        self.recording_thread = RecorderThread(self)
-        self.recording_thread.started.connect(lambda: None)  # optional: if you need additional setup
+        self._stop_event.clear()
         self.recording_thread.start()
+        self._peak_level.value = 0.0
+        self._level_timer.start()
         self.recording_started.emit()
+        return True
     
     @pyqtSlot()
     def stop_recording(self):
@@ -179,114 +297,191 @@ class AudioRecorder(QObject):
             return
 
         self.is_recording = False
-        if self.recording_thread and self.recording_thread.isRunning():
-            self.recording_thread.quit()
-            if not self.recording_thread.wait(1000):  # Wait up to 1 second
-                print("Warning: Recording thread did not terminate in time.")
-
-        duration = 0
-        if hasattr(self, 'filename_48k') and self.filename_48k and self.frames_48k:
-            if len(self.frames_48k) > 0:
-                duration = self._save_wav(self.filename_48k, self.frames_48k, self.rate_48k)
-                self.last_recording_duration = duration
-        
-        if hasattr(self, 'filename_8k') and self.filename_8k and self.frames_8k:
-            if len(self.frames_8k) > 0:
-                self._save_wav(self.filename_8k, self.frames_8k, self.rate_8k)
-
-        self.recording_stopped.emit(duration)
+        self._stop_event.set()
+        self._level_timer.stop()
+        # The recording thread writes the last blocks, saves the files and then
+        # emits recording_stopped, so the GUI does not wait for the disk
 
     
     def _record_audio(self):
         try:
             # Determine dtype based on self.format
-            dtype = self.format if self.format in ['int16', 'int24', 'float32'] else 'int16'
+            dtype = self.format if self.format in ['int16', 'int32', 'float32'] else 'int16'
+            takes = [(self.filename_48k, self.buffer_48k, self.rate_48k)]
 
             # Create 48kHz stream (required)
             stream_48k = sd.InputStream(
                 device=self.device_48k,
                 channels=self.channels,
                 samplerate=self.rate_48k,
+                blocksize=self.chunk_size, # Same-sized blocks every callback
                 callback=self._callback_48k,
                 dtype=dtype # Use the selected dtype
             )
 
-            # Only create the 8kHz stream if enabled
+            # Only create the 8kHz stream if enabled and it records from its own device
             stream_8k = None
-            if self.enable_8k and self.device_8k is not None:
+            if self.enable_8k and self.device_8k is not None and not self._derive_8k:
                 stream_8k = sd.InputStream(
                     device=self.device_8k,
                     channels=self.channels,
                     samplerate=self.rate_8k,
+                    blocksize=self.chunk_size,
                     callback=self._callback_8k,
                     dtype=dtype # Use the same dtype
                 )
+                takes.append((self.filename_8k, self.buffer_8k, self.rate_8k))
             
-            # Use different context managers depending on the availability of the 8kHz stream
-            if stream_8k is not None:
-                with stream_48k, stream_8k:
-                    while self.is_recording:
-                        time.sleep(0.1)
-                        if not self.is_recording: # Check again inside the loop
-                            break
-            else:
-                with stream_48k:
-                    while self.is_recording:
-                        time.sleep(0.1)
-                        if not self.is_recording: # Check again inside the loop
-                            break
+            # The streams record from their callbacks into ring buffers;
+            # this thread drains them to the output files as it goes
+            outputs = [(buffer, self._open_output(filename, rate)) for filename, buffer, rate in takes]
+
+            try:
+                # Start whichever streams exist; they are stopped and closed again on exit
+                with contextlib.ExitStack() as stack:
+                    stack.enter_context(stream_48k)
+                    if stream_8k is not None:
+                        stack.enter_context(stream_8k)
+                    self._drain_until_stopped(outputs)
+            finally:
+                # Streams are closed now, write whatever the callbacks left behind
+                for buffer, sound_file in outputs:
+                    buffer.drain(sound_file.write)
+                    sound_file.close()
+
+            # Saved here rather than in stop_recording so trimming and encoding stay off the GUI thread;
+            # the files are independent, so with auto-trim their read, trim and write overlap
+            futures = [_SAVE_POOL.submit(self._finish_file, filename, buffer, rate) for filename, buffer, rate in takes]
+            durations = [future.result() for future in futures]
+            if self._derive_8k and durations[0] > 0:
+                self._save_resampled(self.filename_48k, self.filename_8k, self.rate_8k)
+            self.last_recording_duration = durations[0]
+            self.recording_stopped.emit(durations[0])
                         
         except Exception as e:
             self.is_recording = False
             import traceback
             error_details = f"Device: {self.device_48k}, Rate: {self.rate_48k}\n{traceback.format_exc()}"
             self.error_occurred.emit(f"Recording error: {str(e)}\n{error_details}")
-    
+            # Nothing is saved from a failed take, don't leave its in-progress files behind
+            for filename in (self.filename_48k, self.filename_8k):
+                if filename and os.path.exists(self._partial_path(filename)):
+                    os.remove(self._partial_path(filename))
+            # Let the UI leave the "saving" state; a zero duration registers nothing
+            self.last_recording_duration = 0.0
+            self.recording_stopped.emit(0.0)
+
+    def _drain_until_stopped(self, outputs):
+        """Write recorded audio to disk every 100 ms until stop_recording is called."""
+        while not self._stop_event.wait(0.1):
+            for buffer, sound_file in outputs:
+                buffer.drain(sound_file.write)
+
+    def _partial_path(self, filepath):
+        """Path a take is written to while recording; it replaces filepath when saved."""
+        root, ext = os.path.splitext(filepath)
+        return f"{root}.part{ext}"
+
+    def _output_options(self):
+        """soundfile format arguments for the configured file format and bit depth."""
+        if self.file_format == 'flac':
+            # FLAC has no float subtype, keep 24-bit integer precision instead
+            subtype = 'PCM_24' if self.subtype == 'FLOAT' else self.subtype
+            return {'format': 'FLAC', 'subtype': subtype, 'compression_level': FLAC_COMPRESSION_LEVEL}
+        return {'format': 'WAV', 'subtype': self.subtype}
+
+    def _open_output(self, filepath, samplerate):
+        """Open the in-progress file for one stream."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        return sf.SoundFile(self._partial_path(filepath), mode='w', samplerate=samplerate,
+                            channels=self.channels, **self._output_options())
+
+    def _finish_file(self, filepath, buffer, samplerate):
+        """
+        Move a finished take into place, trimming it first if enabled.
+
+        Returns:
+            float: Duration of the saved audio in seconds, 0.0 if nothing was saved.
+        """
+        partial_path = self._partial_path(filepath)
+        if not os.path.exists(partial_path):
+            return 0.0
+        if buffer.overflowed:
+            print(f"Warning: Disk writes fell behind while recording {os.path.basename(filepath)}; some audio was dropped.")
+        if buffer.frames == 0:
+            print(f"Warning: No frames received for {filepath}. Skipping save.")
+            os.remove(partial_path)
+            return 0.0
+
+        try:
+            if self.auto_trim_on_save:
+                # Trimming needs the whole take, read it back once
+                audio_data, _ = sf.read(partial_path, dtype=buffer.dtype, always_2d=True)
+                duration = self._save_wav(filepath, audio_data, samplerate)
+                if duration > 0:
+                    os.remove(partial_path)
+                else:
+                    # Keep the untrimmed take, it is the only copy of the recording. The name is
+                    # unique per take and does not end in the audio extension, so the next take
+                    # of this item cannot overwrite it and it is not counted as a recording.
+                    kept_path = f"{filepath}.untrimmed-{time.strftime('%Y%m%d-%H%M%S')}"
+                    os.replace(partial_path, kept_path)
+                    print(f"Warning: Kept the untrimmed recording at {kept_path}.")
+                return duration
+            os.replace(partial_path, filepath)
+            duration = buffer.frames / samplerate
+            print(f"Saved: {os.path.basename(filepath)}, Duration: {duration:.2f}s, Subtype: {self.subtype}")
+            return duration
+        except Exception as e:
+            self.error_occurred.emit(f"Failed to save audio file '{filepath}': {str(e)}")
+            return 0.0
+
+    def _save_resampled(self, source_path, filepath, samplerate):
+        """Save a copy of the finished take at source_path, resampled to samplerate."""
+        try:
+            # Reading the saved take keeps the copy in step with any trimming applied to it
+            audio_data, source_rate = sf.read(source_path, dtype=self.buffer_48k.dtype, always_2d=True)
+            audio_data = resample_audio(audio_data, source_rate, samplerate)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            sf.write(filepath, audio_data, samplerate, **self._output_options())
+            print(f"Saved: {os.path.basename(filepath)}, Duration: {len(audio_data) / samplerate:.2f}s, Subtype: {self.subtype}")
+        except Exception as e:
+            self.error_occurred.emit(f"Failed to save audio file '{filepath}': {str(e)}")
+
     def _callback_48k(self, indata, frames, time_info, status):
         """Callback for 48kHz stream."""
         if status:
             print(f"48kHz stream status: {status}")
         
-        # Calculate the audio level for the meter
+        # Calculate the audio level for the meter from two reductions,
+        # without allocating an abs() copy of the block
         if len(indata) > 0:
-            audio_level = np.max(np.abs(indata)) * 100
-            self.level_meter.emit(audio_level)
+            level = max(float(indata.max()), -float(indata.min())) * self._level_scale
+            if level > self._peak_level.value:
+                self._peak_level.value = level
         
         # Store the audio data
-        self.frames_48k.append(indata.copy())
+        self.buffer_48k.write(indata)
     
+    def _emit_level(self):
+        """Emit the peak level seen since the last update and reset it."""
+        level = self._peak_level.value
+        self._peak_level.value = 0.0
+        self.level_meter.emit(level)
+
     def _callback_8k(self, indata, frames, time_info, status):
         """Callback for 8kHz stream."""
         if status:
             print(f"8kHz stream status: {status}")
         
         # Store the audio data
-        self.frames_8k.append(indata.copy())
+        self.buffer_8k.write(indata)
 
-    def _save_wav(self, filepath, frames, samplerate):
-        """Save audio frames to a WAV file using soundfile, optionally trimming."""
-        if not frames:
+    def _save_wav(self, filepath, audio_data, samplerate):
+        """Save recorded audio to a WAV or FLAC file using soundfile, optionally trimming."""
+        if len(audio_data) == 0:
              print(f"Warning: No frames received for {filepath}. Skipping save.")
              return 0.0
-
-        # Convert list of numpy arrays to a single numpy array
-        # Ensure the array is contiguous
-        try:
-            audio_data = np.concatenate(frames, axis=0)
-        except ValueError as e:
-            print(f"Error concatenating frames for {filepath}: {e}")
-            # Attempt to fix if shapes mismatch slightly (rare with InputStream)
-            if frames:
-                 max_len = max(f.shape[0] for f in frames)
-                 frames_padded = [np.pad(f, ((0, max_len - f.shape[0]), (0, 0)), 'constant') if f.shape[0] < max_len else f for f in frames]
-                 try:
-                     audio_data = np.concatenate(frames_padded, axis=0)
-                     print("Warning: Had to pad frames to concatenate.")
-                 except ValueError as e2:
-                      self.error_occurred.emit(f"Failed to save {filepath}: Inconsistent audio frame shapes. {e2}")
-                      return 0.0
-            else: # Should have been caught by the initial 'if not frames'
-                 return 0.0
             
         # Apply trimming if enabled
         if self.auto_trim_on_save:
@@ -324,15 +519,21 @@ class AudioRecorder(QObject):
              final_audio_data = audio_data
              duration = len(final_audio_data) / samplerate
 
-        # Save using soundfile
+        # Save using soundfile, to a temporary file first so a failed write
+        # never leaves a truncated file in place of an earlier take
+        root, ext = os.path.splitext(filepath)
+        temp_path = f"{root}.tmp{ext}"
         try:
             os.makedirs(os.path.dirname(filepath), exist_ok=True)
             # Subtype (bit depth) is already stored in self.subtype
-            sf.write(filepath, final_audio_data, samplerate, subtype=self.subtype)
+            sf.write(temp_path, final_audio_data, samplerate, **self._output_options())
+            os.replace(temp_path, filepath)
             print(f"Saved: {os.path.basename(filepath)}, Duration: {duration:.2f}s, Subtype: {self.subtype}")
             return duration
 
         except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             self.error_occurred.emit(f"Failed to save audio file '{filepath}': {str(e)}")
             return 0.0
         
@@ -1,7 +1,16 @@
 import os
+import importlib.util
 import pandas as pd
 import datetime
-from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QSettings
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QSettings, QTimer
+
+# pandas' multithreaded Arrow CSV parser is much faster on large manifests; pyarrow is
+# optional, so fall back to the default C parser when it is not installed. The Arrow
+# parser rejects some files the C parser reads (e.g. quoted fields containing newlines),
+# so load_csv retries those with the C parser.
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+SAVE_DELAY_MS = 2000 # Quiet period after the last edit before the CSV is rewritten
 
 class DataManager(QObject):
     """
@@ -26,6 +35,13 @@ class DataManager(QObject):
         self.total_audio_count = 0  # Count of recorded audio files
         self.total_duration = 0.0   # Total duration of all recordings
         self.csv_path = None        # Path to CSV file
+        self._id_to_index = {}      # str(id) -> row index, built in load_csv
+        
+        # Edits are written to the CSV in one go once they stop for SAVE_DELAY_MS
+        self._dirty = False
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self.flush)
         
         # Required columns in CSV
         self.required_columns = ['id', 'text']
@@ -143,9 +159,17 @@ class DataManager(QObject):
             return None
     
     def load_csv(self, file_path=None):
+        # Write pending edits to the previous file before its dataframe is replaced
+        self.flush()
         try:
             # Load CSV into dataframe
-            df = pd.read_csv(file_path)
+            try:
+                df = pd.read_csv(file_path, engine=CSV_ENGINE)
+            except Exception as e:
+                if CSV_ENGINE == 'c':
+                    raise
+                print(f"Warning: pyarrow could not parse {file_path} ({e}); retrying with the C parser.")
+                df = pd.read_csv(file_path, engine='c')
             
             # Handle case-insensitive column mapping for required and metadata columns
             column_mapping = {
@@ -175,14 +199,26 @@ class DataManager(QObject):
             # Reset index to ensure sequential numbering
             df = df.reset_index(drop=True)
             
+            # Metadata columns repeat a handful of values over every row
+            for col in ('language', 'style', 'speaker'):
+                if col in df.columns:
+                    df[col] = df[col].astype('category')
+            
+            # Look up rows by ID without scanning the column; the first row wins for duplicate IDs
+            id_to_index = {}
+            for index, id_value in enumerate(df['id'].astype(str)):
+                id_to_index.setdefault(id_value, index)
+            
             # Store dataframe and update current index
             self.dataframe = df
+            self._id_to_index = id_to_index
             self.csv_path = file_path
             self.current_index = 0
             
-            # Calculate metrics
-            self.total_audio_count = df['recorded'].sum()
-            self.total_duration = df['duration'].sum()
+            # Calculate metrics in one reduction; edits keep them up to date from here on
+            totals = df[['recorded', 'duration']].sum()
+            self.total_audio_count = int(totals['recorded'])
+            self.total_duration = float(totals['duration'])
             
             # Emit signal with loaded data
             self.data_loaded.emit(df)
@@ -220,6 +256,8 @@ class DataManager(QObject):
             
             # Save dataframe to CSV
             self.dataframe.to_csv(save_path, index=False)
+            self._dirty = False
+            self._save_timer.stop()
             
             # Update current path
             self.csv_path = save_path
@@ -233,6 +271,22 @@ class DataManager(QObject):
             self.error_occurred.emit(f"Error saving CSV: {str(e)}")
             return False
     
+    def _schedule_save(self):
+        """Mark the data as changed and (re)start the delayed CSV write."""
+        self._dirty = True
+        self._save_timer.start(SAVE_DELAY_MS)
+
+    def flush(self):
+        """
+        Write pending changes to the CSV file now.
+        
+        Returns:
+            bool: True if nothing was pending or the save succeeded, False otherwise
+        """
+        if not self._dirty:
+            return True
+        return self.save_csv()
+    
     def create_new_csv(self, file_path):
         """
         Create a new empty CSV file with required columns.
@@ -306,9 +360,9 @@ class DataManager(QObject):
             return False
             
         # Find index with matching ID
-        matches = self.dataframe[self.dataframe['id'] == id_value].index
-        if not matches.empty:
-            self.current_index = matches[0]
+        index = self._id_to_index.get(str(id_value))
+        if index is not None:
+            self.current_index = index
             self.current_item_changed.emit(self.dataframe.iloc[self.current_index])
             return True
         else:
@@ -347,36 +401,53 @@ class DataManager(QObject):
             # Update values
             for key, value in data_dict.items():
                 if key in self.dataframe.columns:
-                    self.dataframe.at[self.current_index, key] = value
-                    
-            # Update metrics
-            self.total_audio_count = self.dataframe['recorded'].sum()
-            self.total_duration = self.dataframe['duration'].sum()
+                    self._set_value(self.current_index, key, value)
                     
             # Save changes
             if self.csv_path:
-                self.save_csv()
+                self._schedule_save()
                 
             return True
         else:
             return False
     
-    def register_recording(self, audio_path_48k, audio_path_8k, duration):
+    def _set_value(self, index, key, value):
         """
-        Register a new audio recording for the current item.
+        Set one column of a row, adjusting the running totals by the change so
+        they never need a full-column sum.
+        
+        Args:
+            index (int): Row index
+            key (str): Column name
+            value: New value
+        """
+        if key == 'recorded':
+            old = self.dataframe.at[index, key]
+            self.total_audio_count += int(bool(value)) - (int(bool(old)) if pd.notna(old) else 0)
+        elif key == 'duration':
+            old = self.dataframe.at[index, key]
+            self.total_duration += float(value) - (float(old) if pd.notna(old) else 0.0)
+        self.dataframe.at[index, key] = value
+    
+    def register_recording(self, audio_path_48k, audio_path_8k, duration, index=None):
+        """
+        Register a new audio recording for an item.
         
         Args:
             audio_path_48k (str): Path to 48kHz audio file
             audio_path_8k (str): Path to 8kHz audio file
             duration (float): Duration in seconds
+            index (int, optional): Row the take was recorded for (defaults to the current item)
             
         Returns:
             bool: True if successful, False otherwise
         """
         if self.dataframe is None or self.dataframe.empty:
             return False
+        if index is None:
+            index = self.current_index
             
-        if 0 <= self.current_index < len(self.dataframe):
+        if 0 <= index < len(self.dataframe):
             # Update record
             update_data = {
                 'recorded': True,
@@ -389,15 +460,11 @@ class DataManager(QObject):
             # Update dataframe
             for key, value in update_data.items():
                 if key in self.dataframe.columns:
-                    self.dataframe.at[self.current_index, key] = value
-                    
-            # Update metrics
-            self.total_audio_count = self.dataframe['recorded'].sum()
-            self.total_duration = self.dataframe['duration'].sum()
+                    self._set_value(index, key, value)
             
             # Save changes
             if self.csv_path:
-                self.save_csv()
+                self._schedule_save()
                 
             return True
         else:
@@ -423,13 +490,11 @@ class DataManager(QObject):
             
             # Update duration if provided
             if new_duration is not None:
-                old_duration = self.dataframe.at[self.current_index, 'duration']
-                self.dataframe.at[self.current_index, 'duration'] = new_duration
-                self.total_duration = self.total_duration - old_duration + new_duration
+                self._set_value(self.current_index, 'duration', new_duration)
             
             # Save changes
             if self.csv_path:
-                self.save_csv()
+                self._schedule_save()
                 
             return True
         else:
@@ -1,69 +1,211 @@
 from PyQt5.QtCore import QObject, pyqtSignal
-import time
+import numpy as np
 import sounddevice as sd
 
 class PlaybackWorker(QObject):
     finished = pyqtSignal()           # Emitted when playback finishes
     error_occurred = pyqtSignal(str)  # Emitted if an error happens
 
-    def __init__(self, audio_data, sample_rate, channels, start_position, 
-                 get_seek_position_callback, update_position_callback, 
-                 stop_flag_getter, is_paused_getter):
+    def __init__(self, audio_data, sample_rate, channels, start_sample,
+                 seek_sample, stop_flag, resume_event):
         """
         Parameters:
           audio_data: The numpy array containing the audio.
           sample_rate: Playback sample rate.
           channels: Number of channels.
-          start_position: Starting sample index.
-          get_seek_position_callback: A callable returning the current seek position in seconds (or None if no seek).
-          update_position_callback: A callable to update current playback position.
-          stop_flag_getter: A callable that returns True when playback should stop.
-          is_paused_getter: A callable that returns True if playback is paused.
+          start_sample: Index of the sample to start playing from.
+          seek_sample: A ctypes.c_int64 holding a requested sample index to jump to (-1 if no seek).
+          stop_flag: A ctypes.c_int that is set to non-zero when playback should stop.
+          resume_event: A threading.Event that is set while playback should run and cleared while paused.
         """
         super().__init__()
-        self.audio_data = audio_data
-        self.sample_rate = sample_rate
         self.channels = channels
-        self.start_sample = int(start_position * sample_rate)
-        self.get_seek_position = get_seek_position_callback
-        self.update_position = update_position_callback
-        self.stop_flag_getter = stop_flag_getter
-        self.is_paused_getter = is_paused_getter
+        self.audio_data = self._as_frames(audio_data)
+        self.sample_rate = sample_rate
+        self.current_sample = start_sample
+        self.seek_sample = seek_sample
+        self.stop_flag = stop_flag
+        self.resume_event = resume_event
+        self.stream = None
+        self._closing = False # Set while the stream is torn down to switch buffers
+        # (first sample of the last block, DAC time it starts playing at), swapped as one tuple
+        self._last_block = None
+
+    def _as_frames(self, audio_data):
+        """
+        Return audio_data as a C-contiguous (frames, channels) array, so every
+        block the callback copies into outdata is a plain contiguous view.
+        """
+        return np.ascontiguousarray(audio_data).reshape(len(audio_data), self.channels)
 
     def run(self):
-        """Runs the blocking playback loop."""
+        """
+        Open the output stream and start it. PortAudio pulls audio through
+        _callback from its own thread, so there is no Python write loop.
+        """
         try:
-            current_sample = self.start_sample
-            buffer_size = int(self.sample_rate * 0.1)  # 100 ms chunks
-            # Create the output stream
-            stream = sd.OutputStream(
-                samplerate=self.sample_rate,
-                channels=self.channels,
-                dtype='int16'
-            )
-            with stream:
-                while not self.stop_flag_getter() and current_sample < len(self.audio_data):
-                    # Check if playback is paused and if so, wait without advancing playback
-                    if self.is_paused_getter():
-                        time.sleep(0.1)
-                        continue
-                    # Check for seek request
-                    seek_seconds = self.get_seek_position()
-                    if seek_seconds is not None:
-                        current_sample = int(seek_seconds * self.sample_rate)
-                    # Read the next chunk
-                    end_sample = min(current_sample + buffer_size, len(self.audio_data))
-                    if self.channels == 1:
-                        chunk = self.audio_data[current_sample:end_sample]
-                    else:
-                        chunk = self.audio_data[current_sample:end_sample, :]
-                    # Write chunk to stream
-                    stream.write(chunk)
-                    current_sample = end_sample
-                    # Update the current playback position in seconds
-                    self.update_position(current_sample / self.sample_rate)
-                # Playback finished normally
+            self._open_stream()
+        except Exception as e:
+            self.error_occurred.emit(f"Playback error: {str(e)}")
             self.finished.emit()
+
+    def _open_stream(self):
+        """Open an output stream at the current sample rate, started unless paused."""
+        self.stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype='int16',
+            blocksize=0, # Let the host API pick its optimal (variable) block size
+            latency='low', # Responsive seeks and pauses
+            callback=self._callback,
+            finished_callback=self._stream_finished
+        )
+        if self.resume_event.is_set():
+            self.stream.start()
+
+    def restart(self, audio_data, start_sample):
+        """
+        Play audio_data from start_sample, reusing the open stream. The audio
+        must have this worker's sample rate and channel count.
+        """
+        self.audio_data = self._as_frames(audio_data)
+        self.current_sample = min(start_sample, len(self.audio_data))
+        self._last_block = None
+        try:
+            if self.stream is None:
+                self._open_stream()
+                return
+            if not self.stream.stopped:
+                # A stream that ended through CallbackStop must be stopped before it restarts
+                self._closing = True
+                self.stream.abort()
+                self._closing = False
+            self.stream.start()
         except Exception as e:
+            self._closing = False
             self.error_occurred.emit(f"Playback error: {str(e)}")
             self.finished.emit()
+
+    def set_buffer(self, audio_data, sample_rate, start_sample):
+        """
+        Continue playback from start_sample of another buffer. The stream is
+        only reopened when the sample rate changes; this worker stays alive.
+        """
+        audio_data = self._as_frames(audio_data)
+        if sample_rate == self.sample_rate and self.stream is not None:
+            # The callback picks up both on its next block
+            self.audio_data = audio_data
+            self.seek_sample.value = start_sample
+            return
+
+        try:
+            if self.stream is not None:
+                self._closing = True
+                self.stream.abort()
+                self.stream.close()
+            self.audio_data = audio_data
+            self.sample_rate = sample_rate
+            self.current_sample = min(start_sample, len(audio_data))
+            self.seek_sample.value = -1
+            self._last_block = None
+            self._closing = False
+            self._open_stream()
+        except Exception as e:
+            self._closing = False
+            self.stream = None
+            self.error_occurred.emit(f"Playback error: {str(e)}")
+            self.finished.emit()
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Fill one PortAudio block straight from the loaded audio buffer."""
+        if self.stop_flag.value:
+            raise sd.CallbackAbort
+        # Output silence for the blocks between pause() and the stream actually stopping
+        if not self.resume_event.is_set():
+            outdata.fill(0)
+            self._last_block = None
+            return
+        audio_data = self.audio_data # set_buffer may swap it between blocks
+        total = len(audio_data)
+        start = self.current_sample # Work on locals, store back once per block
+        # Check for seek request
+        seek_sample = self.seek_sample
+        target = seek_sample.value
+        if target >= 0:
+            seek_sample.value = -1
+            start = min(target, total)
+        self._last_block = (start, time_info.outputBufferDacTime)
+        end_sample = min(start + frames, total)
+        n = end_sample - start
+        np.copyto(outdata[:n], audio_data[start:end_sample])
+        if n < frames:
+            outdata[n:] = 0
+        self.current_sample = end_sample
+        if end_sample >= total:
+            # Playback finished normally; finished_callback fires once the tail is played
+            raise sd.CallbackStop
+
+    def _stream_finished(self):
+        """Forward the stream's end to finished, except when it was stopped to pause or switch buffers."""
+        if self.resume_event.is_set() and not self._closing:
+            self.finished.emit()
+
+    def pause(self):
+        """Stop the stream without closing it, so no callbacks run while paused."""
+        self.resume_event.clear()
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+            except Exception as e:
+                self.error_occurred.emit(f"Playback error: {str(e)}")
+        self._last_block = None
+
+    def resume(self):
+        """Restart the stream from the current sample."""
+        self.resume_event.set()
+        if self.stream is not None:
+            try:
+                self.stream.start()
+            except Exception as e:
+                self.error_occurred.emit(f"Playback error: {str(e)}")
+                self.finished.emit()
+
+    def playback_sample(self):
+        """
+        Get the index of the sample currently reaching the output device.
+        This trails current_sample by the stream's output latency.
+        """
+        block, stream = self._last_block, self.stream
+        if block is None or stream is None:
+            return self.current_sample
+        start_sample, dac_time = block
+        if dac_time <= 0: # Some host APIs do not report DAC timestamps
+            return self.current_sample
+        elapsed = max(0.0, stream.time - dac_time)
+        return min(start_sample + int(elapsed * self.sample_rate), len(self.audio_data))
+
+    def is_active(self):
+        """Return True while the output stream is running."""
+        return self.stream is not None and self.stream.active
+
+    def stop(self):
+        """Abort the output stream but keep it open, so restart() skips reopening the device."""
+        if self.stream is not None:
+            self._closing = True
+            try:
+                self.stream.abort()
+            except Exception as e:
+                self.error_occurred.emit(f"Playback error: {str(e)}")
+            self._closing = False
+
+    def close(self):
+        """Abort and close the output stream."""
+        if self.stream is not None:
+            self._closing = True
+            try:
+                self.stream.abort()
+                self.stream.close()
+            except Exception as e:
+                self.error_occurred.emit(f"Playback error: {str(e)}")
+            self._closing = False
+            self.stream = None
@@ -1,18 +1,19 @@
-import sounddevice as sd
-import numpy as np
-import wave
 import os
+import math
 import time
-from datetime import datetime
 
 def test_recording():
+    # Imported here so importing this module does not load PortAudio
+    import sounddevice as sd
+    import soundfile as sf
+
     # Recording parameters
     sample_rate = 48000  # 48kHz
     channels = 1  # Mono
     duration = 5  # 5 seconds
     
     # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
     output_file = f"test_recording_{timestamp}.wav"
     
     print(f"Starting recording for {duration} seconds...")
@@ -23,24 +24,27 @@ def test_recording():
                       channels=channels,
                       dtype='int16')
     
-    # Display countdown
-    for i in range(duration, 0, -1):
-        print(f"Recording... {i} seconds remaining")
-        time.sleep(1)
+    # Display countdown from the stream's own clock; the loop ends as soon as the recording does
+    stream = sd.get_stream()
+    start_time = stream.time
+    shown = None
+    while stream.active:
+        remaining = math.ceil(duration - (stream.time - start_time))
+        if remaining != shown and remaining > 0:
+            print(f"Recording... {remaining} seconds remaining")
+            shown = remaining
+        sd.sleep(50)
     
-    # Wait for recording to complete
+    # Wait for recording to complete (returns at once, and raises if the stream failed)
     sd.wait()
     
     print("Recording finished!")
 
-    print(recording.shape, recording)
+    if os.environ.get("DEBUG_REC"): # Dump the captured samples only when debugging
+        print(recording.shape, recording)
     
-    # Save recording to WAV file
-    with wave.open(output_file, 'wb') as wf:
-        wf.setnchannels(channels)
-        wf.setsampwidth(2)  # 16-bit audio
-        wf.setframerate(sample_rate)
-        wf.writeframes(recording.tobytes())
+    # Save recording to WAV file; soundfile writes straight from the int16 array
+    sf.write(output_file, recording, sample_rate, subtype='PCM_16')
     
     file_path = os.path.abspath(output_file)
     print(f"Recording saved to: {file_path}")
@@ -39,6 +39,10 @@ class MainWindow(QMainWindow):
         # Initialize output_dir to None
         self.output_dir = None
         
+        # (index, id) of the item being recorded; the take is saved in the background
+        # and the user may navigate away before recording_stopped arrives
+        self._recording_item = None
+        
         # Initialize ScriptWindow reference
         self.script_window = None
         
@@ -291,7 +295,7 @@ class MainWindow(QMainWindow):
 
     def connect_signals(self):
         # Top controls
-        self.update_device_list_btn.clicked.connect(self.update_device_list)
+        self.update_device_list_btn.clicked.connect(self.refresh_device_list)
         self.submit_btn.clicked.connect(self.initialize_recording)
         self.enable_8k_checkbox.stateChanged.connect(self.update_ui_for_8k_toggle)
         
@@ -467,7 +471,10 @@ class MainWindow(QMainWindow):
             os.makedirs(os.path.dirname(filename_8k), exist_ok=True)
         
         try:
-            self.audio_recorder.start_recording(device_48k, device_8k, filename_48k, filename_8k)
+            # A take still being saved refuses the new one; only then is its item replaced,
+            # recording_stopped is queued to this thread so it cannot arrive before
+            if self.audio_recorder.start_recording(device_48k, device_8k, filename_48k, filename_8k):
+                self._recording_item = (self.data_manager.current_index, text_id)
             # on_recording_started will handle UI updates like traffic light
         except Exception as e:
             self.show_error(f"Recording error: {str(e)}")
@@ -505,12 +512,19 @@ class MainWindow(QMainWindow):
     def on_recording_stopped(self, duration): # duration is from the saved file
         self.recording_panel.set_recording_state(False) # Update button in panel
         
-        current_id = self.text_id.text()
-        if not current_id:
-            print("Warning: Cannot register recording, no ID in UI field after stop.")
+        if self._recording_item is None:
+            print("Warning: Cannot register recording, no item was captured at start.")
             self.traffic_indicator.setState("off") # Or red if error state is preferred
             if self.script_window and self.script_window.isVisible(): self.script_window.update_indicator_state(self.traffic_indicator.getState())
             return
+        item_index, current_id = self._recording_item
+        self._recording_item = None
+        # The CSV may have been reloaded while the take was saved; never write into another item's row
+        dataframe = self.data_manager.dataframe
+        item_moved = (dataframe is None or not 0 <= item_index < len(dataframe)
+                      or str(dataframe.at[item_index, 'id']) != current_id)
+        # Only touch the per-item UI if the user is still on the recorded item
+        still_current = self.data_manager.current_index == item_index
 
         filename_48k = getattr(self.audio_recorder, 'filename_48k', None)
         filename_8k = getattr(self.audio_recorder, 'filename_8k', None)
@@ -519,27 +533,34 @@ class MainWindow(QMainWindow):
         final_audio_path_48k = filename_48k if (filename_48k and os.path.exists(filename_48k)) else ''
         final_audio_path_8k = filename_8k if (enable_8k_was_on and filename_8k and os.path.exists(filename_8k)) else ''
         
-        if duration > 0 and final_audio_path_48k:
+        if duration > 0 and final_audio_path_48k and item_moved:
+            self.show_error(f"Recording for {current_id} was saved to {final_audio_path_48k}, "
+                            "but the data was reloaded meanwhile, so it was not registered.")
+            self.traffic_indicator.setState("off")
+        elif duration > 0 and final_audio_path_48k:
             self.data_manager.register_recording(
                 final_audio_path_48k,
                 final_audio_path_8k,
-                duration
+                duration,
+                index=item_index
             )
-            self.recording_panel.set_recorded_indicator(True)
-            self.recording_panel.set_upload_status(False) # Reset upload status for new recording
+            if still_current:
+                self.recording_panel.set_recorded_indicator(True)
+                self.recording_panel.set_upload_status(False) # Reset upload status for new recording
             
             stats = self.data_manager.get_total_stats()
             self.progress_bar.setValue(int(stats['progress_percent']))
             self.statusBar().showMessage(f"Saved {current_id}. Duration: {duration:.1f}s")
             self.traffic_indicator.setState("green") # Saved successfully
 
-            if self.waveform_widget.load_audio_file(final_audio_path_48k):
-                self.audio_player.load_audio_file(final_audio_path_48k, final_audio_path_8k) # Pre-load for player
-            
-            # Auto-upload if enabled
-            settings = QSettings()
-            if settings.value("storage/auto_upload", False, bool):
-                QTimer.singleShot(500, self.upload_recording)
+            if still_current:
+                if self.waveform_widget.load_audio_file(final_audio_path_48k):
+                    self.audio_player.load_audio_file(final_audio_path_48k, final_audio_path_8k) # Pre-load for player
+                
+                # Auto-upload if enabled (upload_recording works on the current item)
+                settings = QSettings()
+                if settings.value("storage/auto_upload", False, bool):
+                    QTimer.singleShot(500, self.upload_recording)
         else:
             self.show_error(f"Recording for {current_id} failed to save or duration was zero.")
             self.traffic_indicator.setState("off") # Or Red for error state
@@ -695,13 +716,16 @@ class MainWindow(QMainWindow):
     def _trim_single_file(self, file_path, item_id_for_log):
         """Helper to trim a single audio file. Returns (success_bool, new_duration, message_str)."""
         from utils.audio_utils import trim_silence_numpy # Local import for helper
+        import soundfile as sf
+        # Read samples in the dtype soundfile writes for the target subtype, so the
+        # trimmed slice is written back as is without a float round trip
+        subtype = getattr(self.audio_recorder, 'subtype', 'PCM_16')
+        read_dtype = {'PCM_16': 'int16', 'PCM_24': 'int32', 'FLOAT': 'float32'}.get(subtype, 'float64')
         try:
             # Load audio data using soundfile
-            audio_data, samplerate = sf.read(file_path, always_2d=False)
+            audio_data, samplerate = sf.read(file_path, dtype=read_dtype, always_2d=False)
             if audio_data.ndim > 1: # Ensure mono for trimming
                 audio_data = audio_data[:, 0]
-            
-            original_dtype = audio_data.dtype # Preserve original dtype for saving
 
             # Get trimming parameters from AudioRecorder settings
             threshold_db = getattr(self.audio_recorder, 'silence_threshold_db', -40.0)
@@ -715,19 +739,6 @@ class MainWindow(QMainWindow):
             )
 
             if new_duration > 0:
-                # Convert back to original dtype if it was changed by trim_silence_numpy (e.g. to float)
-                # and if soundfile needs specific subtype
-                subtype = getattr(self.audio_recorder, 'subtype', 'PCM_16')
-                if subtype == 'PCM_16' and trimmed_audio.dtype != np.int16:
-                    # Example: If trim_silence_numpy returns float in [-1, 1]
-                    trimmed_audio = (trimmed_audio * 32767).astype(np.int16)
-                elif subtype == 'PCM_24' and trimmed_audio.dtype != np.int32: # sf uses int32 for 24bit
-                    # Assuming float in [-1, 1]
-                    trimmed_audio = (trimmed_audio * 8388607).astype(np.int32)
-                elif subtype == 'FLOAT' and trimmed_audio.dtype != np.float32:
-                    trimmed_audio = trimmed_audio.astype(np.float32)
-                # Add more conversions if necessary based on how trim_silence_numpy handles dtypes
-
                 sf.write(file_path, trimmed_audio, samplerate, subtype=subtype)
                 return True, new_duration, f"Trimmed {os.path.basename(file_path)}. New duration: {new_duration:.2f}s"
             else:
@@ -963,7 +974,9 @@ class MainWindow(QMainWindow):
     def update_audio_counter(self):
         if self.output_dir and os.path.exists(os.path.join(self.output_dir, '48khz')):
             dir_48k = os.path.join(self.output_dir, '48khz')
-            count = len([f for f in os.listdir(dir_48k) if f.endswith( ('.wav', '.flac') )]) # Check for common formats
+            # Check for common formats; skip takes still being written (ID.part.wav, ID.tmp.wav)
+            count = len([f for f in os.listdir(dir_48k) if f.endswith( ('.wav', '.flac') )
+                         and not f.endswith( ('.part.wav', '.part.flac', '.tmp.wav', '.tmp.flac') )])
             self.audio_counter_label.setText(f"Audio Count: {count}")
         else:
             self.audio_counter_label.setText(f"Audio Count: 0")
@@ -1017,6 +1030,12 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.save_settings()
+        # Takes are saved on the recording thread; let it finish and deliver
+        # recording_stopped so the take is registered before the CSV is written
+        self.audio_recorder.stop_recording()
+        self.audio_recorder.recording_thread.wait()
+        QApplication.processEvents()
+        self.data_manager.flush() # Write any CSV edits still waiting for the save timer
         # Clean up script window if it exists
         if self.script_window:
             self.script_window.close() # Ensure it's properly closed
@@ -1091,6 +1110,11 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Device Test Complete", 
                             f"{results_text}\nFound {len(working_devices)} working devices out of {len(devices)} detected.")
 
+    def refresh_device_list(self):
+        """Rescan the audio devices instead of using the recorder's cached listing."""
+        self.audio_recorder.invalidate_device_cache()
+        self.update_device_list()
+
     def update_device_list(self, working_devices_first=None):
         all_devices = self.audio_recorder.get_available_devices()
         
@@ -5,6 +5,7 @@ from PyQt5.QtCore import Qt, pyqtSlot
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import soundfile as sf
+from utils.audio_utils import load_pcm_mono, pcm16_to_float32, peak_envelope
 
 # Define dark theme colors for the plot
 # These can be adjusted to better match your main application's dark theme
@@ -16,6 +17,9 @@ DARK_THEME_WAVEFORM_COLOR = '#569CD6'   # A nice blue for the waveform
 DARK_THEME_POSITION_LINE_COLOR = '#D16969' # A reddish color for the position line
 DARK_THEME_TICK_COLOR = '#AAAAAA'       # Color for the tick marks themselves
 
+# Above this many samples the waveform is drawn as a min/max envelope of this many points
+MAX_PLOT_POINTS = 4000
+
 class WaveformWidget(QWidget):
     """Widget that displays audio waveforms and allows for seeking."""
 
@@ -110,10 +114,19 @@ class WaveformWidget(QWidget):
             # Re-add the position line even if no data, at position 0
             self.position_line = self.axes.axvline(x=0, color=DARK_THEME_POSITION_LINE_COLOR, linestyle='-', lw=1.5)
         else:
-            time_axis = np.arange(len(self.audio_data)) / float(self.sample_rate)
-
-            # Plot waveform with dark theme color
-            self.axes.plot(time_axis, self.audio_data, linewidth=0.7, color=DARK_THEME_WAVEFORM_COLOR)
+            if len(self.audio_data) > MAX_PLOT_POINTS:
+                # Long takes: draw the min/max envelope, which looks the same at screen
+                # resolution but hands matplotlib a few thousand points instead of millions
+                block_size = -(-len(self.audio_data) // MAX_PLOT_POINTS)
+                mins, maxs = peak_envelope(self.audio_data, block_size)
+                time_axis = np.arange(len(mins)) * (block_size / float(self.sample_rate))
+                self.axes.fill_between(time_axis, mins, maxs, linewidth=0.7,
+                                       color=DARK_THEME_WAVEFORM_COLOR, edgecolor=DARK_THEME_WAVEFORM_COLOR)
+            else:
+                time_axis = np.arange(len(self.audio_data)) / float(self.sample_rate)
+
+                # Plot waveform with dark theme color
+                self.axes.plot(time_axis, self.audio_data, linewidth=0.7, color=DARK_THEME_WAVEFORM_COLOR)
 
             max_amplitude = np.max(np.abs(self.audio_data)) if len(self.audio_data) > 0 else 1.0
             y_limit = max(max_amplitude * 1.1, 0.1) 
@@ -167,7 +180,13 @@ class WaveformWidget(QWidget):
     def load_audio_file(self, file_path):
         """Load audio file and update the waveform display."""
         try:
-            audio_data, sample_rate = sf.read(file_path, always_2d=False) 
+            # Plain integer PCM mono WAVs are read raw and scaled in one pass; everything
+            # else is decoded by libsndfile straight to float32 (half the size of float64)
+            audio_data, sample_rate = load_pcm_mono(file_path)
+            if audio_data is not None:
+                audio_data = pcm16_to_float32(audio_data)
+            else:
+                audio_data, sample_rate = sf.read(file_path, dtype='float32', always_2d=False)
 
             if audio_data.ndim > 1: # Convert to mono
                 audio_data = audio_data[:, 0]
@@ -1,6 +1,44 @@
 # utils/audio_utils.py
+import os
+import math
+import struct
 import numpy as np
 
+TRIM_SCAN_BLOCK = 65536 # Samples compared per step when scanning for the trim bounds
+RESAMPLE_STOPBAND_DB = 80 # Attenuation of everything that would alias into the resampled audio
+RESAMPLE_PASSBAND = 0.9 # Fraction of the output Nyquist band kept flat; the filter rolls off above it
+RESAMPLE_CHUNK = 1 << 20 # Filter taps gathered per step, bounds the temporary arrays
+
+def _find_loud_edge(audio_data, threshold, from_end=False):
+    """
+    Find the first (or last) sample whose magnitude exceeds threshold.
+
+    The array is scanned block by block from the chosen end, so the boolean
+    temporaries stay one block long and the scan stops at the first hit.
+
+    Args:
+        audio_data (np.ndarray): Mono audio samples.
+        threshold: Magnitude threshold in the units of audio_data.
+        from_end (bool): Scan backwards from the last sample.
+
+    Returns:
+        int: Index of the sample, or -1 if no sample exceeds threshold.
+    """
+    n = len(audio_data)
+    for offset in range(0, n, TRIM_SCAN_BLOCK):
+        if from_end:
+            lo, hi = max(0, n - offset - TRIM_SCAN_BLOCK), n - offset
+        else:
+            lo, hi = offset, min(n, offset + TRIM_SCAN_BLOCK)
+        block = audio_data[lo:hi]
+        # Two comparisons instead of abs(), which would wrap the most negative integer sample
+        loud = (block > threshold) | (block < -threshold)
+        if loud.any():
+            if from_end:
+                return hi - 1 - int(loud[::-1].argmax())
+            return lo + int(loud.argmax())
+    return -1
+
 def trim_silence_numpy(audio_data, sample_rate, threshold_db=-40, padding_ms=100):
     """
     Trim silence from the beginning and end of a NumPy audio array using a dB threshold.
@@ -13,42 +51,35 @@ def trim_silence_numpy(audio_data, sample_rate, threshold_db=-40, padding_ms=100
         padding_ms (int): Milliseconds of padding to add around the detected audio.
 
     Returns:
-        np.ndarray: The trimmed audio data.
+        np.ndarray: The trimmed audio data, a slice of the input with the same dtype.
         float: The duration of the trimmed audio in seconds.
     """
     if audio_data.size == 0:
         return audio_data, 0.0
 
-    # Ensure audio_data is float for amplitude calculations
-    if not np.issubdtype(audio_data.dtype, np.floating):
-        # Convert int16 to float range [-1.0, 1.0]
-        if audio_data.dtype == np.int16:
-            audio_data = audio_data.astype(np.float32) / 32767.0
-        else: # Add other integer types if needed
-             # Basic fallback: Normalize assuming max possible value
-             max_val = np.iinfo(audio_data.dtype).max
-             audio_data = audio_data.astype(np.float32) / max_val
-
-
     # Convert dB threshold to amplitude threshold
     amplitude_threshold = 10**(threshold_db / 20.0)
 
-    # Calculate absolute amplitude
-    amplitude = np.abs(audio_data)
+    if np.issubdtype(audio_data.dtype, np.floating):
+        threshold = amplitude_threshold
+    else:
+        # Compare integer samples against an integer threshold in the same full-scale
+        # units, so no float copy of the whole take is made. For integers,
+        # x > floor(t) is the same test as x > t.
+        max_val = np.iinfo(audio_data.dtype).max
+        threshold = audio_data.dtype.type(min(int(amplitude_threshold * max_val), max_val))
 
-    # Find where audio exceeds threshold
-    non_silent_indices = np.where(amplitude > amplitude_threshold)[0]
+    # Scan in from each end; only the blocks up to the first loud sample are touched
+    start_idx = _find_loud_edge(audio_data, threshold, from_end=False)
 
     # If no non-silent parts found, return original (or empty if desired)
-    if len(non_silent_indices) == 0:
+    if start_idx < 0:
         # Decide whether to return original or empty array
         # Returning original might be safer if threshold is too high
         # return audio_data, len(audio_data) / sample_rate
         return np.array([], dtype=audio_data.dtype), 0.0 # Return empty
 
-    # Find start and end indices
-    start_idx = non_silent_indices[0]
-    end_idx = non_silent_indices[-1]
+    end_idx = _find_loud_edge(audio_data[start_idx:], threshold, from_end=True) + start_idx
 
     # Add padding (convert ms to samples)
     padding_samples = int(padding_ms * sample_rate / 1000)
@@ -59,4 +90,250 @@ def trim_silence_numpy(audio_data, sample_rate, threshold_db=-40, padding_ms=100
     trimmed_audio = audio_data[start_idx : end_idx + 1] # Slice includes end_idx
 
     duration = len(trimmed_audio) / sample_rate
-    return trimmed_audio, duration
\ No newline at end of file
+    return trimmed_audio, duration
+
+def downmix_to_mono(audio_data):
+    """
+    Collapse a (frames, channels) integer array to mono by averaging the channels.
+
+    Args:
+        audio_data (np.ndarray): 2D array of audio samples, may have a single channel.
+
+    Returns:
+        np.ndarray: 1D array with the same dtype as the input.
+    """
+    if audio_data.shape[1] == 1:
+        return audio_data[:, 0] # Already mono, just drop the channel axis
+    # Sum in a wider type so the int16 adds cannot overflow, then divide back down
+    mixed = audio_data.sum(axis=1, dtype=np.int32) // audio_data.shape[1]
+    return mixed.astype(audio_data.dtype)
+
+
+def pcm16_to_float32(audio_data, out=None):
+    """
+    Scale int16 samples to float32 in [-1, 1) with a single vectorized multiply.
+
+    Args:
+        audio_data (np.ndarray): int16 audio samples.
+        out (np.ndarray, optional): Preallocated float32 array of the same shape to write into.
+
+    Returns:
+        np.ndarray: float32 audio samples.
+    """
+    return np.multiply(audio_data, np.float32(1 / 32768), out=out, dtype=np.float32)
+
+
+def peak_envelope(audio_data, block_size):
+    """
+    Reduce audio to per-block minimum and maximum values for waveform drawing.
+
+    Args:
+        audio_data (np.ndarray): 1D audio samples.
+        block_size (int): Number of samples summarised by each envelope point.
+
+    Returns:
+        tuple: (mins, maxs) arrays with one value per block, same dtype as the input.
+    """
+    n_blocks = -(-len(audio_data) // block_size) # Ceiling division, the last block may be short
+    padded = np.empty(n_blocks * block_size, dtype=audio_data.dtype)
+    padded[:len(audio_data)] = audio_data
+    padded[len(audio_data):] = audio_data[-1] if len(audio_data) else 0 # Pad without adding new peaks
+    blocks = padded.reshape(n_blocks, block_size)
+    return blocks.min(axis=1), blocks.max(axis=1)
+
+
+def _resample_filter(up, down):
+    """
+    Design the Kaiser-windowed sinc low-pass for resampling by up/down.
+
+    The passband ends at RESAMPLE_PASSBAND of the lower Nyquist frequency and the
+    stopband starts at that Nyquist frequency, so nothing above it folds back.
+
+    Args:
+        up (int): Interpolation factor.
+        down (int): Decimation factor.
+
+    Returns:
+        tuple: ((up, taps per phase) float64 array with one polyphase branch per row,
+                scaled by up so the interpolated signal keeps its level;
+                delay of the filter's centre in upsampled samples)
+    """
+    band = 0.5 / max(up, down) # Lower Nyquist frequency, in cycles per upsampled sample
+    transition = band * (1 - RESAMPLE_PASSBAND)
+    # Kaiser's estimates for the window length and shape of the required attenuation
+    num_taps = int(np.ceil((RESAMPLE_STOPBAND_DB - 7.95) / (2.285 * 2 * np.pi * transition))) | 1
+    beta = 0.1102 * (RESAMPLE_STOPBAND_DB - 8.7)
+    cutoff = band - transition / 2
+    n = np.arange(num_taps) - (num_taps - 1) // 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    taps *= up / taps.sum()
+
+    # Tap j of branch r is taps[r + j * up]
+    per_phase = -(-num_taps // up)
+    padded = np.zeros(per_phase * up)
+    padded[:num_taps] = taps
+    return padded.reshape(per_phase, up).T, (num_taps - 1) // 2
+
+
+def resample_audio(audio_data, orig_rate, target_rate):
+    """
+    Resample audio with a polyphase Kaiser-windowed FIR filter, keeping its dtype.
+
+    The rates are reduced to an up/down ratio (48kHz -> 8kHz is 1/6, 48kHz -> 44.1kHz
+    is 147/160) and each output sample is computed from its own polyphase branch,
+    so no upsampled intermediate signal is ever built.
+
+    Args:
+        audio_data (np.ndarray): 1D array of samples or a (frames, channels) array.
+        orig_rate (int): Sample rate of audio_data.
+        target_rate (int): Desired sample rate.
+
+    Returns:
+        np.ndarray: Resampled audio with the dtype and channel layout of audio_data.
+    """
+    if orig_rate == target_rate or audio_data.size == 0:
+        return audio_data
+    if audio_data.ndim > 1:
+        return np.stack([resample_audio(audio_data[:, c], orig_rate, target_rate)
+                         for c in range(audio_data.shape[1])], axis=1)
+
+    orig_rate, target_rate = int(orig_rate), int(target_rate)
+    common = math.gcd(orig_rate, target_rate)
+    up, down = target_rate // common, orig_rate // common
+    branches, delay = _resample_filter(up, down)
+    per_phase = branches.shape[1]
+
+    # float32 holds 16-bit samples exactly; 32-bit integers need float64 to clip and cast back safely
+    work_dtype = np.float32 if audio_data.dtype in (np.int16, np.float32) else np.float64
+    # Reversed, so tap i multiplies the i-th oldest sample of an output's input window
+    branches = branches[:, ::-1].astype(work_dtype)
+    out_len = -(-len(audio_data) * up // down)
+
+    # Output n sits at upsampled position n * down + delay: its branch is that position
+    # modulo up, and its newest input sample is the position divided by up
+    positions = np.arange(out_len, dtype=np.int64) * down + delay
+    newest = positions // up
+    phase = positions % up
+    # Zeros before and after the audio, so every window stays inside the array
+    signal = np.zeros(per_phase - 1 + max(len(audio_data), int(newest[-1]) + 1), dtype=work_dtype)
+    signal[per_phase - 1:per_phase - 1 + len(audio_data)] = audio_data
+    window = np.arange(per_phase)
+
+    resampled = np.empty(out_len, dtype=work_dtype)
+    step = max(1, RESAMPLE_CHUNK // per_phase)
+    for start in range(0, out_len, step):
+        stop = min(start + step, out_len)
+        # Row k holds the per_phase input samples ending at output start + k's newest one
+        windows = signal[newest[start:stop, None] + window]
+        if up == 1:
+            resampled[start:stop] = windows @ branches[0]
+        else:
+            resampled[start:stop] = np.einsum('ij,ij->i', windows, branches[phase[start:stop]])
+
+    if audio_data.dtype.kind == 'i':
+        info = np.iinfo(audio_data.dtype)
+        return np.clip(np.round(resampled), info.min, info.max).astype(audio_data.dtype)
+    return resampled.astype(audio_data.dtype, copy=False)
+
+
+def parse_wav_header(file_path):
+    """
+    Read the format and locate the sample data of a RIFF/WAVE file by walking its chunk headers.
+
+    Args:
+        file_path (str): Path to the WAV file.
+
+    Returns:
+        dict: 'format_tag', 'channels', 'sample_rate', 'bits_per_sample', 'data_offset'
+              and 'data_size' (in bytes, clamped to what is actually in the file),
+              or None if the file is not a RIFF/WAVE file or lacks a fmt or data chunk.
+    """
+    file_size = os.path.getsize(file_path)
+    header = None
+    with open(file_path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None # Reached end of file without a data chunk
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    return None
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', fmt)
+                # WAVE_FORMAT_EXTENSIBLE keeps the real format in the sub-format GUID
+                if format_tag == 0xFFFE and len(fmt) >= 26:
+                    format_tag = struct.unpack_from('<H', fmt, 24)[0]
+                header = {
+                    'format_tag': format_tag,
+                    'channels': channels,
+                    'sample_rate': sample_rate,
+                    'bits_per_sample': bits,
+                }
+                f.seek(chunk_size & 1, 1)
+                continue
+            if chunk_id == b'data':
+                if header is None:
+                    return None
+                offset = f.tell()
+                # Streamed writers may leave the size at 0 or 0xFFFFFFFF
+                header['data_offset'] = offset
+                header['data_size'] = min(chunk_size, file_size - offset) if chunk_size else file_size - offset
+                return header
+            # Chunks are word aligned, odd sizes carry a pad byte
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+def pcm_to_int16(raw_data, sample_width):
+    """
+    Convert little-endian integer PCM bytes to int16 samples with vectorized numpy operations.
+
+    Args:
+        raw_data (bytes-like): PCM sample bytes.
+        sample_width (int): Bytes per sample: 1 (unsigned), 2, 3 (packed) or 4.
+
+    Returns:
+        np.ndarray: int16 audio samples.
+    """
+    if sample_width == 2:
+        return np.frombuffer(raw_data, dtype='<i2')
+    if sample_width == 1:
+        # 8-bit WAV is unsigned with a 128 offset
+        return (np.frombuffer(raw_data, dtype=np.uint8).astype(np.int16) - 128) << 8
+    if sample_width == 3:
+        # Keep the two most significant bytes of each packed 24-bit sample
+        packed = np.frombuffer(raw_data, dtype=np.uint8)
+        packed = packed[:len(packed) - len(packed) % 3].reshape(-1, 3)
+        return np.ascontiguousarray(packed[:, 1:]).view('<i2').ravel()
+    if sample_width == 4:
+        return (np.frombuffer(raw_data, dtype='<i4') >> 16).astype(np.int16)
+    raise ValueError(f"Unsupported PCM sample width: {sample_width} bytes")
+
+def load_pcm_mono(file_path):
+    """
+    Read a plain integer PCM mono WAV (8, 16, 24 or 32 bit) as int16, bypassing libsndfile.
+
+    Args:
+        file_path (str): Path to the WAV file.
+
+    Returns:
+        tuple: (audio_data, sample_rate), or (None, None) if the file is not integer PCM mono.
+    """
+    header = parse_wav_header(file_path)
+    if (header is None or header['format_tag'] != 1 or header['channels'] != 1
+            or header['bits_per_sample'] not in (8, 16, 24, 32)):
+        return None, None
+
+    sample_width = header['bits_per_sample'] // 8
+    with open(file_path, 'rb') as f:
+        f.seek(header['data_offset'])
+        if sample_width == 2:
+            # Common case: read straight into the int16 array, no intermediate bytes
+            data = np.empty(header['data_size'] // 2, dtype='<i2')
+            f.readinto(data)
+            return data, header['sample_rate']
+        raw_data = f.read(header['data_size'] - header['data_size'] % sample_width)
+    return pcm_to_int16(raw_data, sample_width), header['sample_rate']